@@ -4,10 +4,13 @@ import json
 import numpy as np
 import trimesh
 import pyvista as pv
+from collections import defaultdict
+from shapely.geometry import LineString
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QFileDialog,
-                             QMessageBox, QTabWidget)
+                             QMessageBox, QTabWidget, QGroupBox, QFormLayout,
+                             QDoubleSpinBox)
 from PyQt5.QtCore import Qt
 from pyvistaqt import QtInteractor
 from matplotlib.figure import Figure
@@ -15,34 +18,66 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
 # --- Funciones de Geometría ---
 
-def interpolate_radius(y_pos, profile_points):
-    """Calcula el radio en una posición Y específica."""
-    p1, p2 = None, None
-    for i in range(len(profile_points) - 1):
-        if profile_points[i]['position'] <= y_pos <= profile_points[i+1]['position']:
-            p1, p2 = profile_points[i], profile_points[i+1]
-            break
-    if not p1: return profile_points[-1]['diameter'] / 2.0
-    y1, r1 = p1['position'], p1['diameter'] / 2.0
-    y2, r2 = p2['position'], p2['diameter'] / 2.0
-    if (y2 - y1) == 0: return r1
-    return r1 + (r2 - r1) * ((y_pos - y1) / (y2 - y1))
-
-def create_revolved_solid(profile_points, resolution=100):
+def load_profile(path):
+    """Lee un perfil .json y guarda sus posiciones y diámetros como arrays ('_pos', '_dia')."""
+    with open(path, 'r') as f: data = json.load(f)
+    measurements = data.get('measurements', [])
+    data['_pos'] = np.array([p['position'] for p in measurements], dtype=np.float64)
+    data['_dia'] = np.array([p['diameter'] for p in measurements], dtype=np.float64)
+    return data
+
+def interpolate_radius_vec(y_arr, positions, radii):
+    """Calcula el radio en varias posiciones Y a la vez (interpolación lineal por tramos)."""
+    y_arr = np.clip(np.asarray(y_arr, dtype=np.float64), positions[0], positions[-1])
+    idx = np.clip(np.searchsorted(positions, y_arr) - 1, 0, len(positions) - 2)
+    y1, y2 = positions[idx], positions[idx + 1]
+    r1, r2 = radii[idx], radii[idx + 1]
+    return r1 + (r2 - r1) * (y_arr - y1) / np.maximum(y2 - y1, 1e-12)
+
+def fix_profile_steps(positions, epsilon=0.001):
+    """
+    Convierte los escalones verticales (posiciones repetidas) en diagonales muy
+    pronunciadas. Las repeticiones consecutivas reciben offsets crecientes para
+    que el perfil siga siendo monótono. Devuelve un array nuevo.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    dup = np.concatenate(([False], positions[1:] == positions[:-1]))
+    dup_count = np.cumsum(dup)
+    run_start = np.maximum.accumulate(np.where(dup, 0, dup_count))
+    return positions + epsilon * (dup_count - run_start)
+
+def simplify_profile(profile_2d, tolerance):
+    """Reduce los puntos de un perfil 2D con Douglas-Peucker (tolerancia en mm); 0 lo deja intacto."""
+    if tolerance <= 0 or len(profile_2d) < 3: return profile_2d
+    return np.asarray(LineString(profile_2d).simplify(tolerance, preserve_topology=False).coords)
+
+def create_revolved_solid(positions, diameters, resolution=100, tolerance=0.0):
     """Crea un sólido 3D revolucionando un perfil (radio, pos) alrededor del eje Y."""
-    fixed_points = []
-    for i, point in enumerate(profile_points):
-        if i > 0 and point['position'] == profile_points[i-1]['position']:
-            point['position'] += 0.001
-        fixed_points.append(point)
-    profile_2d = [(p['diameter'] / 2, p['position']) for p in fixed_points]
+    profile_2d = np.column_stack((diameters * 0.5, fix_profile_steps(positions)))
+    profile_2d = simplify_profile(profile_2d, tolerance)
     mesh = trimesh.creation.revolve(linestring=profile_2d, resolution=resolution)
     return mesh
 
+def create_cutter_template(cutter_height, d_outer_hole):
+    """Crea el cortador cónico de un agujero centrado en el origen, con su eje en Z."""
+    d_inner_hole = d_outer_hole + 1.0
+    template_cutter_profile = [
+        (0, -cutter_height/2), (d_outer_hole/2, -cutter_height/2),
+        (d_inner_hole/2, cutter_height/2), (0, cutter_height/2)
+    ]
+    return trimesh.creation.revolve(linestring=template_cutter_profile, axis=[0,0,1])
+
 def trimesh_to_pyvista(trimesh_mesh):
-    """Convierte una malla de Trimesh a una malla de PyVista."""
-    faces = np.c_[np.full(len(trimesh_mesh.faces), 3), trimesh_mesh.faces]
-    return pv.PolyData(trimesh_mesh.vertices, faces)
+    """Convierte una malla de Trimesh a una malla de PyVista (se guarda en la propia malla)."""
+    pv_mesh = getattr(trimesh_mesh, '_pv_cache', None)
+    if pv_mesh is None:
+        faces = np.empty((len(trimesh_mesh.faces), 4), dtype=np.int32)
+        faces[:, 0] = 3
+        faces[:, 1:] = trimesh_mesh.faces
+        # float32 solo para la visualización; la malla de Trimesh (y los STL) siguen en float64
+        pv_mesh = pv.PolyData(trimesh_mesh.vertices.astype(np.float32), faces)
+        trimesh_mesh._pv_cache = pv_mesh
+    return pv_mesh
 
 # --- Clase Principal de la GUI ---
 
@@ -66,13 +101,21 @@ class PartViewerApp(QMainWindow):
         self.load_internal_btn = QPushButton("Cargar Perfil Interno (.json)")
         self.external_label = QLabel("Perfil Externo: No cargado")
         self.load_external_btn = QPushButton("Cargar Perfil Externo (.json)")
+        params_group = QGroupBox("Parámetros de Generación")
+        params_layout = QFormLayout(params_group)
+        self.simplify_input = QDoubleSpinBox(self)
+        self.simplify_input.setDecimals(3); self.simplify_input.setRange(0.0, 1.0)
+        self.simplify_input.setSingleStep(0.01); self.simplify_input.setValue(0.05); self.simplify_input.setSuffix(" mm")
+        self.simplify_input.setToolTip("Tolerancia de simplificación del perfil antes de revolucionar.\n0 usa todos los puntos medidos.")
+        params_layout.addRow("Simplificación de Perfil:", self.simplify_input)
         self.generate_btn = QPushButton("1. Visualizar Perfiles y Piezas")
         self.export_btn = QPushButton("2. Exportar Piezas Individuales...")
         
         controls_layout.addWidget(self.load_internal_btn)
         controls_layout.addWidget(self.internal_label); controls_layout.addSpacing(20)
         controls_layout.addWidget(self.load_external_btn)
-        controls_layout.addWidget(self.external_label); controls_layout.addStretch()
+        controls_layout.addWidget(self.external_label); controls_layout.addSpacing(20)
+        controls_layout.addWidget(params_group); controls_layout.addStretch()
         controls_layout.addWidget(self.generate_btn); controls_layout.addWidget(self.export_btn)
 
         self.tabs = QTabWidget()
@@ -104,63 +147,68 @@ class PartViewerApp(QMainWindow):
         if not hasattr(self, 'internal_path') or not self.internal_path or not hasattr(self, 'external_path') or not self.external_path:
             QMessageBox.warning(self, "Archivos Faltantes", "Por favor, carga ambos perfiles."); return
         try:
-            with open(self.internal_path, 'r') as f: self.internal_data = json.load(f)
-            with open(self.external_path, 'r') as f: self.external_data = json.load(f)
+            self.internal_data = load_profile(self.internal_path)
+            self.external_data = load_profile(self.external_path)
         except Exception as e:
             QMessageBox.critical(self, "Error de Lectura", f"Error: {e}"); return
             
         print("Generando modelos base...")
-        self.external_mesh_tm = create_revolved_solid(self.external_data['measurements'])
-        self.internal_mesh_tm = create_revolved_solid(self.internal_data['measurements'])
+        tolerance = self.simplify_input.value()
+        self.external_mesh_tm = create_revolved_solid(self.external_data['_pos'], self.external_data['_dia'], tolerance=tolerance)
+        self.internal_mesh_tm = create_revolved_solid(self.internal_data['_pos'], self.internal_data['_dia'], tolerance=tolerance)
         
         print("Generando cortadores para los agujeros...")
-        self.cutter_meshes_tm = []
-        for i in range(self.internal_data.get("Number of holes", 0)):
-            y_pos = self.internal_data["Holes position"][i]
-            d_outer_hole = self.internal_data["Holes diameter"][i]
-            d_inner_hole = d_outer_hole + 1.0
-
-            r_body_ext = interpolate_radius(y_pos, self.external_data['measurements'])
-            r_body_int = interpolate_radius(y_pos, self.internal_data['measurements'])
-            
-            cutter_height = r_body_ext - r_body_int + 6
-            template_cutter_profile = [
-                (0, -cutter_height/2), (d_outer_hole/2, -cutter_height/2),
-                (d_inner_hole/2, cutter_height/2), (0, cutter_height/2)
-            ]
-            template_cutter = trimesh.creation.revolve(linestring=template_cutter_profile, axis=[0,0,1])
-
-            x_target_pos = (r_body_ext + r_body_int) / 2
-            
-            rotation = trimesh.transformations.rotation_matrix(-np.pi / 2, [0, 1, 0])
-            translation = trimesh.transformations.translation_matrix([x_target_pos, y_pos, 0])
-            
-            transform = translation @ rotation
-            
-            cutter = template_cutter.copy()
-            cutter.apply_transform(transform)
-            self.cutter_meshes_tm.append(cutter)
-            
-            # --- NUEVO: Imprimir datos de depuración para el primer agujero ---
-            if i == 0:
-                print("\n--- DATOS DE DEPURACIÓN (Primer Agujero) ---")
-                print(f"Posición del agujero (Y): {y_pos:.2f}")
-                print(f"Radio Exterior del Cuerpo en Y: {r_body_ext:.2f}")
-                print(f"Radio Interno del Cuerpo en Y: {r_body_int:.2f}")
-                print(f"Posición X objetivo del cortador: {x_target_pos:.2f}")
-                print(f"Límites del cortador ANTES de transformar: {np.round(template_cutter.bounds, 2)}")
-                print(f"Límites del cortador DESPUÉS de transformar: {np.round(cutter.bounds, 2)}")
-                print("------------------------------------------\n")
+        n_holes = self.internal_data.get("Number of holes", 0)
+        hole_positions = self.internal_data.get("Holes position", [])[:n_holes]
+        r_body_ext_all = interpolate_radius_vec(hole_positions, self.external_data['_pos'], self.external_data['_dia'] / 2.0)
+        r_body_int_all = interpolate_radius_vec(hole_positions, self.internal_data['_pos'], self.internal_data['_dia'] / 2.0)
+
+        hole_diameters = np.asarray(self.internal_data.get("Holes diameter", [])[:n_holes], dtype=np.float64)
+        cutter_heights = r_body_ext_all - r_body_int_all + 6
+        x_target_positions = (r_body_ext_all + r_body_int_all) / 2
+
+        # Transformaciones de todos los agujeros apiladas en un tensor (N, 4, 4): traslación @ rotación
+        rotation = trimesh.transformations.rotation_matrix(-np.pi / 2, [0, 1, 0])
+        transforms = np.tile(rotation, (n_holes, 1, 1))
+        transforms[:, 0, 3] = x_target_positions
+        transforms[:, 1, 3] = hole_positions
+
+        # Los agujeros con la misma altura de cortador y diámetro comparten la plantilla revolucionada
+        groups = defaultdict(list)
+        for i in range(n_holes):
+            groups[(round(cutter_heights[i], 3), round(hole_diameters[i], 3))].append(i)
+
+        self.cutter_meshes_tm = [None] * n_holes
+        templates = {}
+        for key, indices in groups.items():
+            template_cutter = templates[key] = create_cutter_template(*key)
+            vertices_h = np.column_stack((template_cutter.vertices, np.ones(len(template_cutter.vertices))))
+            transformed = np.einsum('nij,vj->nvi', transforms[indices], vertices_h)[..., :3]
+            for k, i in enumerate(indices):
+                self.cutter_meshes_tm[i] = trimesh.Trimesh(vertices=transformed[k], faces=template_cutter.faces, process=False)
+
+        # --- NUEVO: Imprimir datos de depuración para el primer agujero ---
+        if n_holes > 0:
+            template_cutter = templates[(round(cutter_heights[0], 3), round(hole_diameters[0], 3))]
+            print("\n--- DATOS DE DEPURACIÓN (Primer Agujero) ---")
+            print(f"Posición del agujero (Y): {hole_positions[0]:.2f}")
+            print(f"Radio Exterior del Cuerpo en Y: {r_body_ext_all[0]:.2f}")
+            print(f"Radio Interno del Cuerpo en Y: {r_body_int_all[0]:.2f}")
+            print(f"Posición X objetivo del cortador: {x_target_positions[0]:.2f}")
+            print(f"Límites del cortador ANTES de transformar: {np.round(template_cutter.bounds, 2)}")
+            print(f"Límites del cortador DESPUÉS de transformar: {np.round(self.cutter_meshes_tm[0].bounds, 2)}")
+            print("------------------------------------------\n")
 
         self.plot_2d(); self.plot_3d()
         print("Visualización actualizada con todas las piezas.")
 
     def plot_2d(self):
         self.mpl_figure.clear(); ax = self.mpl_figure.add_subplot(111)
-        ax.plot([p['position'] for p in self.internal_data['measurements']], [p['diameter']/2 for p in self.internal_data['measurements']], 'r--', label='Interno')
-        ax.plot([p['position'] for p in self.internal_data['measurements']], [-p['diameter']/2 for p in self.internal_data['measurements']], 'r--')
-        ax.plot([p['position'] for p in self.external_data['measurements']], [p['diameter']/2 for p in self.external_data['measurements']], 'b-', label='Externo')
-        ax.plot([p['position'] for p in self.external_data['measurements']], [-p['diameter']/2 for p in self.external_data['measurements']], 'b-')
+        int_pos, int_rad = self.internal_data['_pos'], self.internal_data['_dia'] / 2
+        ext_pos, ext_rad = self.external_data['_pos'], self.external_data['_dia'] / 2
+        lines = ax.plot(int_pos, int_rad, 'r--', int_pos, -int_rad, 'r--',
+                        ext_pos, ext_rad, 'b-', ext_pos, -ext_rad, 'b-')
+        lines[0].set_label('Interno'); lines[2].set_label('Externo')
         ax.set_aspect('equal'); ax.set_xlabel("Posición (mm)"); ax.set_ylabel("Radio (mm)"); ax.set_title("Perfiles"); ax.legend(); ax.grid(True); self.mpl_canvas.draw()
 
     def plot_3d(self):
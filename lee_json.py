@@ -3,11 +3,11 @@ import os
 import numpy as np
 import trimesh
 
-def create_revolved_solid_trimesh(profile_points, resolution=100):
+def create_revolved_solid_trimesh(positions, diameters, resolution=100):
     """
     Crea un sólido 3D por revolución usando Trimesh.
     """
-    profile_2d = [(p['diameter'] / 2, p['position']) for p in profile_points]
+    profile_2d = np.column_stack((np.asarray(diameters, dtype=np.float64) / 2, positions))
     
     mesh = trimesh.creation.revolve(
         linestring=profile_2d,
@@ -15,18 +15,19 @@ def create_revolved_solid_trimesh(profile_points, resolution=100):
     )
     return mesh
 
-def fix_profile_steps(measurements):
+def fix_profile_steps(positions, epsilon=0.001):
     """
     Busca escalones verticales en el perfil y los convierte en diagonales
-    muy pronunciadas añadiendo un pequeño offset.
+    muy pronunciadas añadiendo un pequeño offset. Las posiciones repetidas
+    consecutivas reciben offsets crecientes para que el perfil siga siendo
+    monótono. Devuelve un array nuevo; la entrada no se modifica.
     """
-    new_measurements = []
-    for i, point in enumerate(measurements):
-        if i > 0 and point['position'] == measurements[i-1]['position']:
-            # Se encontró un escalón vertical. Añadir un offset minúsculo.
-            point['position'] += 0.001
-        new_measurements.append(point)
-    return new_measurements
+    positions = np.asarray(positions, dtype=np.float64)
+    dup = np.concatenate(([False], positions[1:] == positions[:-1]))
+    dup_count = np.cumsum(dup)
+    # Reinicia la cuenta al comienzo de cada racha de repeticiones
+    run_start = np.maximum.accumulate(np.where(dup, 0, dup_count))
+    return positions + epsilon * (dup_count - run_start)
 
 
 def assemble_final_model(internal_data, external_data, output_filename):
@@ -37,25 +38,23 @@ def assemble_final_model(internal_data, external_data, output_filename):
 
     # --- NUEVO: Corregir los perfiles antes de usarlos ---
     print("1. Corrigiendo perfiles para eliminar escalones verticales...")
-    external_data['measurements'] = fix_profile_steps(external_data['measurements'])
-    internal_data['measurements'] = fix_profile_steps(internal_data['measurements'])
+    external_pos = fix_profile_steps([p['position'] for p in external_data['measurements']])
+    internal_pos = fix_profile_steps([p['position'] for p in internal_data['measurements']])
+    external_dia = [p['diameter'] for p in external_data['measurements']]
+    internal_dia = [p['diameter'] for p in internal_data['measurements']]
     
     print("2. Creando sólidos de revolución...")
-    external_solid_tm = create_revolved_solid_trimesh(external_data['measurements'])
-    internal_solid_tm = create_revolved_solid_trimesh(internal_data['measurements'])
+    external_solid_tm = create_revolved_solid_trimesh(external_pos, external_dia)
+    internal_solid_tm = create_revolved_solid_trimesh(internal_pos, internal_dia)
     
-    print("3. Vaciando el cuerpo de la flauta...")
-    try:
-        # Se añade un último intento de procesado por si acaso
-        if not external_solid_tm.is_watertight: external_solid_tm = external_solid_tm.process()
-        if not internal_solid_tm.is_watertight: internal_solid_tm = internal_solid_tm.process()
-        
-        hollow_body_tm = external_solid_tm.difference(internal_solid_tm)
-    except Exception as e:
-         print(f"ERROR: La resta final falló incluso después de la corrección: {e}")
-         return
+    # Se añade un último intento de reparación por si acaso. Las mallas de revolución
+    # solo necesitan fusionar vértices y orientar normales (no el process() completo).
+    for solid_tm in (external_solid_tm, internal_solid_tm):
+        if not solid_tm.is_watertight:
+            solid_tm.merge_vertices()
+            solid_tm.fix_normals()
 
-    print("4. Creando y perforando el agujero de embocadura...")
+    print("3. Creando el cortador del agujero de embocadura...")
     hole_pos_z = internal_data['Holes position'][0]
     hole_radius = internal_data['Holes diameter'][0] / 2
     
@@ -65,8 +64,16 @@ def assemble_final_model(internal_data, external_data, output_filename):
     embouchure_cutter_tm = trimesh.creation.cylinder(
         radius=hole_radius, height=80, transform=transform_matrix
     )
-    
-    final_model_tm = hollow_body_tm.difference(embouchure_cutter_tm)
+
+    print("4. Vaciando el cuerpo y perforando la embocadura...")
+    try:
+        # Una sola operación booleana (motor Manifold): externo - interno - embocadura
+        final_model_tm = trimesh.boolean.difference(
+            [external_solid_tm, internal_solid_tm, embouchure_cutter_tm], engine='manifold'
+        )
+    except Exception as e:
+         print(f"ERROR: La resta final falló incluso después de la corrección: {e}")
+         return
 
     print(f"5. Exportando el modelo final a '{output_filename}'...")
     final_model_tm.export(output_filename)
@@ -1,17 +1,24 @@
 import sys
 import os
+import io
 import json
+import multiprocessing
 import numpy as np
 import cadquery as cq
 import pyvista as pv
 import difflib
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+try:
+    import orjson # Opcional: parseo de .json más rápido
+except ImportError:
+    orjson = None
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QFileDialog, QFormLayout,
                              QMessageBox, QTreeWidget, QTreeWidgetItem, QSpinBox,
                              QGroupBox, QHeaderView)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
 from pyvistaqt import QtInteractor
 
 # --- Lógica de Corrección de Archivos ---
@@ -27,13 +34,35 @@ class FileCorrector:
         "right.json", "right_external.json",
         "foot.json", "foot_external.json"
     ]
+    CORRECT_NAMES_SET = frozenset(CORRECT_NAMES)
+
+    TRIGRAM_CUTOFF = 0.6
+    TRIGRAM_MARGIN = 0.2 # Ventaja mínima sobre el segundo candidato para aceptar el trigrama
 
     def __init__(self, base_path):
         self.base_path = base_path
         self.corrections_log = []
+        self._trigram_index = [(name, self._trigrams(name)) for name in self.CORRECT_NAMES]
+
+    @staticmethod
+    def _trigrams(name):
+        return {name[i:i+3] for i in range(len(name) - 2)}
 
     def find_closest_match(self, typo):
-        """Encuentra la coincidencia más cercana en la lista de nombres correctos."""
+        """
+        Encuentra la coincidencia más cercana en la lista de nombres correctos.
+        Primero compara trigramas (índice de Jaccard) contra el índice precalculado y
+        solo acepta el resultado si supera el umbral y le saca una ventaja clara al
+        segundo candidato. En cualquier otro caso decide difflib sobre todos los
+        nombres, como antes: un nombre equivocado aquí acaba renombrando archivos.
+        """
+        typo_trigrams = self._trigrams(typo)
+        if typo_trigrams:
+            scores = sorted(((len(typo_trigrams & tri) / len(typo_trigrams | tri), name) for name, tri in self._trigram_index),
+                            reverse=True)
+            (best_score, best_name), (second_score, _) = scores[0], scores[1]
+            if best_score >= self.TRIGRAM_CUTOFF and best_score - second_score >= self.TRIGRAM_MARGIN:
+                return best_name
         matches = difflib.get_close_matches(typo, self.CORRECT_NAMES, n=1, cutoff=0.8)
         return matches[0] if matches else None
 
@@ -44,35 +73,59 @@ class FileCorrector:
         """
         print("--- Iniciando escaneo y corrección de nombres de archivo ---")
         flute_dirs = [d.path for d in os.scandir(self.base_path) if d.is_dir()]
-        
+
+        renames = []
         for flute_dir in flute_dirs:
             print(f"Escaneando: {os.path.basename(flute_dir)}")
-            for filename in os.listdir(flute_dir):
-                if filename.endswith(".json"):
-                    if filename not in self.CORRECT_NAMES:
-                        correct_name = self.find_closest_match(filename)
-                        if correct_name:
-                            old_path = os.path.join(flute_dir, filename)
-                            new_path = os.path.join(flute_dir, correct_name)
-                            os.rename(old_path, new_path)
-                            log_msg = f"Corregido: '{filename}' -> '{correct_name}' en {os.path.basename(flute_dir)}"
-                            print(log_msg)
-                            self.corrections_log.append(log_msg)
+            with os.scandir(flute_dir) as entries:
+                names = [entry.name for entry in entries]
+            # Destinos ocupados: archivos que ya existen y los que ya reclamó otro renombrado
+            taken = set(names)
+            for filename in names:
+                if filename.endswith(".json") and filename not in self.CORRECT_NAMES_SET:
+                    correct_name = self.find_closest_match(filename)
+                    if not correct_name: continue
+                    if correct_name in taken:
+                        reason = "el destino ya existe" if correct_name in names else "otro archivo se renombra igual"
+                        log_msg = f"Omitido: '{filename}' -> '{correct_name}' en {os.path.basename(flute_dir)} ({reason})"
+                        print(log_msg)
+                        self.corrections_log.append(log_msg)
+                        continue
+                    taken.add(correct_name)
+                    renames.append((flute_dir, filename, correct_name))
+
+        # Renombrar es pura espera de E/S (lenta en discos de red), así que se hace en paralelo
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(os.rename, os.path.join(flute_dir, filename), os.path.join(flute_dir, correct_name))
+                       for flute_dir, filename, correct_name in renames]
+        for (flute_dir, filename, correct_name), future in zip(renames, futures):
+            future.result()
+            log_msg = f"Corregido: '{filename}' -> '{correct_name}' en {os.path.basename(flute_dir)}"
+            print(log_msg)
+            self.corrections_log.append(log_msg)
         print("--- Escaneo finalizado ---")
         return flute_dirs
 
 # --- Lógica de Ensamblaje 3D (Reutilizada y encapsulada) ---
 
-def interpolate_radius(y_pos, profile_points):
-    """Calcula el radio en una posición Y específica."""
-    p1, p2 = None, None
-    for i in range(len(profile_points) - 1):
-        if profile_points[i]['position'] <= y_pos <= profile_points[i+1]['position']:
-            p1, p2 = profile_points[i], profile_points[i+1]; break
-    if not p1: return profile_points[-1]['diameter'] / 2.0
-    y1, r1 = p1['position'], p1['diameter'] / 2.0; y2, r2 = p2['position'], p2['diameter'] / 2.0
-    if abs(y2 - y1) < 1e-9: return r1
-    return r1 + (r2 - r1) * ((y_pos - y1) / (y2 - y1))
+def load_profile(path):
+    """Lee un perfil .json y guarda sus posiciones y diámetros como arrays ('_pos', '_dia')."""
+    if orjson is not None:
+        with open(path, 'rb') as f: data = orjson.loads(f.read())
+    else:
+        with open(path, 'r') as f: data = json.load(f)
+    measurements = data.get('measurements', [])
+    data['_pos'] = np.array([p['position'] for p in measurements], dtype=np.float64)
+    data['_dia'] = np.array([p['diameter'] for p in measurements], dtype=np.float64)
+    return data
+
+def interpolate_radius_vec(y_arr, positions, radii):
+    """Calcula el radio en varias posiciones Y a la vez (interpolación lineal por tramos)."""
+    y_arr = np.clip(np.asarray(y_arr, dtype=np.float64), positions[0], positions[-1])
+    idx = np.clip(np.searchsorted(positions, y_arr) - 1, 0, len(positions) - 2)
+    y1, y2 = positions[idx], positions[idx + 1]
+    r1, r2 = radii[idx], radii[idx + 1]
+    return r1 + (r2 - r1) * (y_arr - y1) / np.maximum(y2 - y1, 1e-12)
 
 class FluteAssembler:
     """
@@ -83,27 +136,47 @@ class FluteAssembler:
         self.external_data = external_data
         self.cone_angle_deg = cone_angle_deg
 
-    def _create_cq_solid_from_profile(self, profile_points):
-        path_pts = [(p['diameter'] / 2, p['position']) for p in profile_points]
-        if not path_pts: return None
-        if path_pts[0][0] > 1e-6: path_pts.insert(0, (0, path_pts[0][1]))
-        if path_pts[-1][0] > 1e-6: path_pts.append((0, path_pts[-1][1]))
-        return cq.Workplane("XZ").polyline(path_pts).close().revolve()
+    # Sólidos de revolución ya construidos, compartidos entre piezas y flautas (cada
+    # pieza crea su propio FluteAssembler). LRU acotada para no retener todos los sólidos
+    # de un escaneo largo en cada proceso. Clave: bytes del perfil (r, z) redondeado a 1e-4 mm.
+    _profile_cache = OrderedDict()
+    _profile_cache_size = 32
+
+    def _create_cq_solid_from_profile(self, positions, diameters):
+        if len(positions) == 0: return None
+        path = np.column_stack((diameters * 0.5, positions))
+        key = np.round(path, 4).tobytes()
+        solid = self._profile_cache.get(key)
+        if solid is None:
+            path_pts = path.tolist()
+            if path_pts[0][0] > 1e-6: path_pts.insert(0, (0, path_pts[0][1]))
+            if path_pts[-1][0] > 1e-6: path_pts.append((0, path_pts[-1][1]))
+            # Las operaciones de CadQuery (cut, translate...) no modifican el sólido, así que se puede reutilizar
+            solid = self._profile_cache[key] = cq.Workplane("XZ").polyline(path_pts).close().revolve()
+            while len(self._profile_cache) > self._profile_cache_size: self._profile_cache.popitem(last=False)
+        else:
+            self._profile_cache.move_to_end(key)
+        return solid
 
     def assemble(self):
         """Realiza el ensamblaje completo y devuelve el sólido de CadQuery."""
-        external_solid = self._create_cq_solid_from_profile(self.external_data['measurements'])
-        internal_solid = self._create_cq_solid_from_profile(self.internal_data['measurements'])
+        external_solid = self._create_cq_solid_from_profile(self.external_data['_pos'], self.external_data['_dia'])
+        internal_solid = self._create_cq_solid_from_profile(self.internal_data['_pos'], self.internal_data['_dia'])
         if not external_solid or not internal_solid: return None
 
         cutters = []
         cone_angle_rad = np.deg2rad(self.cone_angle_deg)
-        for i in range(self.internal_data.get("Number of holes", 0)):
+        n_holes = self.internal_data.get("Number of holes", 0)
+        hole_positions = self.internal_data.get("Holes position", [])[:n_holes]
+        r_body_ext_all = interpolate_radius_vec(hole_positions, self.external_data['_pos'], self.external_data['_dia'] / 2.0)
+        r_body_int_all = interpolate_radius_vec(hole_positions, self.internal_data['_pos'], self.internal_data['_dia'] / 2.0)
+
+        for i in range(n_holes):
             z_pos = self.internal_data["Holes position"][i]
             d_outer_hole = self.internal_data["Holes diameter"][i]
-            
-            r_body_ext = interpolate_radius(z_pos, self.external_data['measurements'])
-            r_body_int = interpolate_radius(z_pos, self.internal_data['measurements'])
+
+            r_body_ext = r_body_ext_all[i]
+            r_body_int = r_body_int_all[i]
             wall_thickness = r_body_ext - r_body_int
             cutter_height = wall_thickness + 4.0 # Margen extra
             
@@ -119,13 +192,23 @@ class FluteAssembler:
             cutters.append(cutter)
             
         result = external_solid.cut(internal_solid)
-        for cutter in cutters:
-            result = result.cut(cutter)
+        if cutters:
+            # Un único corte con todos los cortadores en un compuesto (una sola operación booleana)
+            cutter_compound = cq.Compound.makeCompound([c.val() for c in cutters])
+            result = result.cut(cutter_compound)
         return result
 
 def cq_to_pyvista(cq_obj, quality=100):
     """Convierte un objeto de CadQuery (Solid, Compound, Assembly) a PyVista para visualización."""
-    if cq_obj is None: return pv.PolyData()
+    mesh_arrays = tessellate_arrays(cq_obj, quality)
+    return pv.PolyData(*mesh_arrays) if mesh_arrays else pv.PolyData()
+
+def tessellate_arrays(cq_obj, quality=100):
+    """
+    Tesela un objeto de CadQuery y devuelve los arrays (vértices, caras) que espera
+    pv.PolyData, o None si no hay triángulos. Al ser arrays se pueden enviar entre procesos.
+    """
+    if cq_obj is None: return None
     
     tolerance = 0.5 / quality
 
@@ -137,13 +220,76 @@ def cq_to_pyvista(cq_obj, quality=100):
     elif isinstance(cq_obj, cq.Shape):
         shape = cq_obj
     else:
-        return pv.PolyData()
+        return None
     
     vertices_vector, faces = shape.tessellate(tolerance=tolerance)
-    vertices_np = np.array([v.toTuple() for v in vertices_vector])
-    if len(faces) == 0: return pv.PolyData()
-    faces_pv = np.c_[np.full(len(faces), 3), faces].astype(np.int_)
-    return pv.PolyData(vertices_np, faces_pv)
+    if len(faces) == 0: return None
+    n_vertices = len(vertices_vector)
+    # float32: VTK renderiza en precisión simple; el sólido de CadQuery sigue en float64
+    vertices_np = np.fromiter((c for v in vertices_vector for c in (v.x, v.y, v.z)),
+                              dtype=np.float32, count=3 * n_vertices).reshape(n_vertices, 3)
+    faces_pv = np.empty((len(faces), 4), dtype=np.int32)
+    faces_pv[:, 0] = 3
+    faces_pv[:, 1:] = faces
+    return vertices_np, faces_pv
+
+def _assemble_part(job):
+    """
+    Ensambla una pieza en un proceso aparte. El sólido se devuelve serializado en
+    BREP, ya que los objetos de OCC no se pueden enviar entre procesos. También se
+    tesela aquí a la calidad del escaneo: OCC retiene el GIL, así que hacerlo en un hilo
+    de la GUI la congelaría.
+    """
+    flute_name, part_name, internal_path, external_path, quality = job
+    print(f"Procesando: {flute_name} -> {part_name}")
+    internal_data = load_profile(internal_path)
+    external_data = load_profile(external_path)
+    final_solid = FluteAssembler(internal_data, external_data).assemble()
+    if not final_solid: return None, internal_data, None
+    buffer = io.BytesIO()
+    final_solid.val().exportBrep(buffer)
+    return buffer.getvalue(), internal_data, tessellate_arrays(final_solid, quality)
+
+class AssemblyWorker(QObject):
+    """
+    Reparte el ensamblaje de las piezas en un pool de procesos (fuera del hilo de
+    la GUI) y emite cada pieza a medida que termina.
+    """
+    part_ready = pyqtSignal(str, str, object, object, object) # flute_name, part_name, brep, internal_data, mesh_arrays
+    finished = pyqtSignal()
+
+    def __init__(self, jobs):
+        super().__init__()
+        self.jobs = jobs
+        self._cancelled = False
+
+    def cancel(self):
+        """Pide al worker que deje de emitir piezas y termine los procesos pendientes."""
+        self._cancelled = True
+
+    def run(self):
+        # 'spawn' evita hacer fork de un proceso con hilos de Qt activos
+        executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn"))
+        futures = {executor.submit(_assemble_part, job): job for job in self.jobs}
+        pending = set(futures)
+        while pending:
+            if self._cancelled:
+                # Sin esperar a las piezas en curso: los procesos hijos se terminan
+                processes = list((executor._processes or {}).values())
+                executor.shutdown(wait=False, cancel_futures=True)
+                for process in processes: process.terminate()
+                return
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                flute_name, part_name = futures[future][:2]
+                try:
+                    brep, internal_data, mesh_arrays = future.result()
+                except Exception as e:
+                    print(f"ERROR al procesar {flute_name}/{part_name}: {e}"); continue
+                if brep:
+                    self.part_ready.emit(flute_name, part_name, brep, internal_data, mesh_arrays)
+        executor.shutdown()
+        self.finished.emit()
 
 # --- Clase Principal de la GUI ---
 
@@ -155,6 +301,12 @@ class FluteBrowserApp(QMainWindow):
 
         self.base_path = None
         self.flutes_data = {} # Estructura: { "flute_name": { "part_name": {"solid": cq_solid, "data": internal_data}, ... } }
+        # Caché LRU de teselados por (flauta, pieza, calidad) y de actores ya subidos al visor.
+        # Las mallas a la calidad del escaneo llegan ya hechas desde el pool de procesos.
+        self._mesh_cache = OrderedDict()
+        self._mesh_cache_size = 64
+        self._actors = OrderedDict() # LRU, mismo límite que las mallas: { (flute_name, part_name, quality, view): actor }
+        self._assembly_thread, self._assembly_worker = None, None
 
         main_widget = QWidget(); self.setCentralWidget(main_widget)
         main_layout = QHBoxLayout(main_widget)
@@ -220,8 +372,13 @@ class FluteBrowserApp(QMainWindow):
 
         self.flutes_data.clear()
         self.flute_tree.clear()
-        QApplication.setOverrideCursor(Qt.WaitCursor)
+        self._mesh_cache.clear()
+        self._actors.clear()
+        self.plotter_3d.clear()
+        self._flute_items = {}
 
+        jobs = []
+        self._scan_quality = self.quality_input.value()
         for flute_dir in flute_dirs:
             flute_name = os.path.basename(flute_dir)
             
@@ -233,36 +390,57 @@ class FluteBrowserApp(QMainWindow):
                         part_files[part_name]['external'] = os.path.join(flute_dir, filename)
                     else:
                         part_files[part_name]['internal'] = os.path.join(flute_dir, filename)
-            
-            if not part_files: continue
-
-            self.flutes_data[flute_name] = {}
-            flute_item = QTreeWidgetItem(self.flute_tree, [flute_name])
-            flute_item.setData(0, Qt.UserRole, flute_name)
 
             for part_name, files in sorted(part_files.items()):
                 if 'internal' in files and 'external' in files:
-                    print(f"Procesando: {flute_name} -> {part_name}")
-                    try:
-                        with open(files['internal'], 'r') as f: internal_data = json.load(f)
-                        with open(files['external'], 'r') as f: external_data = json.load(f)
-                        
-                        assembler = FluteAssembler(internal_data, external_data)
-                        final_solid = assembler.assemble()
-
-                        if final_solid:
-                            self.flutes_data[flute_name][part_name] = {
-                                "solid": final_solid,
-                                "data": internal_data
-                            }
-                            part_item = QTreeWidgetItem(flute_item, [part_name])
-                            part_item.setData(0, Qt.UserRole, (flute_name, part_name))
-                    except Exception as e:
-                        print(f"ERROR al procesar {flute_name}/{part_name}: {e}")
-        
+                    jobs.append((flute_name, part_name, files['internal'], files['external'], self._scan_quality))
+        # Sitio para todas las piezas a la calidad del escaneo y a una segunda calidad
+        self._mesh_cache_size = max(64, 2 * len(jobs))
+
+        self.load_btn.setEnabled(False)
+        QApplication.setOverrideCursor(Qt.BusyCursor)
+        self._assembly_thread = QThread()
+        self._assembly_worker = AssemblyWorker(jobs)
+        self._assembly_worker.moveToThread(self._assembly_thread)
+        self._assembly_thread.started.connect(self._assembly_worker.run)
+        self._assembly_worker.part_ready.connect(self.on_part_assembled)
+        self._assembly_worker.finished.connect(self.on_assembly_finished)
+        self._assembly_worker.finished.connect(self._assembly_thread.quit)
+        self._assembly_thread.start()
+
+    def closeEvent(self, event):
+        # Cerrar la ventana no debe destruir un QThread en marcha ni dejar vivos los procesos del pool
+        if self._assembly_thread is not None and self._assembly_thread.isRunning():
+            self._assembly_worker.cancel(); self._assembly_thread.quit(); self._assembly_thread.wait()
+        super().closeEvent(event)
+
+    def on_part_assembled(self, flute_name, part_name, brep, internal_data, mesh_arrays):
+        """Recibe una pieza ensamblada (y ya teselada) por AssemblyWorker y la añade al árbol."""
+        final_solid = cq.Workplane(cq.Shape.importBrep(io.BytesIO(brep)))
+        if mesh_arrays is not None:
+            self._cache_mesh((flute_name, part_name, self._scan_quality), pv.PolyData(*mesh_arrays))
+
+        flute_item = self._flute_items.get(flute_name)
+        if flute_item is None:
+            flute_item = self._flute_items[flute_name] = QTreeWidgetItem(self.flute_tree, [flute_name])
+            flute_item.setData(0, Qt.UserRole, flute_name)
+            self.flutes_data[flute_name] = {}
+
+        self.flutes_data[flute_name][part_name] = {
+            "solid": final_solid,
+            "data": internal_data
+        }
+        part_item = QTreeWidgetItem(flute_item, [part_name])
+        part_item.setData(0, Qt.UserRole, (flute_name, part_name))
+        flute_item.sortChildren(0, Qt.AscendingOrder)
+        flute_item.setExpanded(True)
+
+    def on_assembly_finished(self):
+        self.flute_tree.sortItems(0, Qt.AscendingOrder)
         self.flute_tree.expandAll()
         self.flute_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
         QApplication.restoreOverrideCursor()
+        self.load_btn.setEnabled(True)
         QMessageBox.information(self, "Proceso Completado", f"Se han cargado {len(self.flutes_data)} flautas.")
 
     def refresh_current_model(self):
@@ -275,7 +453,12 @@ class FluteBrowserApp(QMainWindow):
         if not item_data: return
 
         QApplication.setOverrideCursor(Qt.WaitCursor)
-        self.plotter_3d.clear()
+        quality = self.quality_input.value()
+        for key, actor in list(self._actors.items()):
+            if key[2] != quality:
+                self.plotter_3d.remove_actor(self._actors.pop(key), render=False)
+            else:
+                actor.SetVisibility(False)
 
         if isinstance(item_data, tuple):
             flute_name, part_name = item_data
@@ -286,14 +469,43 @@ class FluteBrowserApp(QMainWindow):
 
         if reset_camera:
             self.plotter_3d.reset_camera()
+        self.plotter_3d.render()
         QApplication.restoreOverrideCursor()
 
+    def _cache_mesh(self, key, mesh):
+        self._mesh_cache[key] = mesh
+        self._mesh_cache.move_to_end(key)
+        while len(self._mesh_cache) > self._mesh_cache_size: self._mesh_cache.popitem(last=False)
+
+    def _tessellate_part(self, flute_name, part_name, quality):
+        """Devuelve la malla de una pieza cargada, teselándola solo si no está en la caché."""
+        key = (flute_name, part_name, quality)
+        mesh = self._mesh_cache.get(key)
+        if mesh is None:
+            mesh = cq_to_pyvista(self.flutes_data[flute_name][part_name]["solid"], quality)
+        self._cache_mesh(key, mesh)
+        return mesh
+
+    def _show_actor(self, key, make_mesh, color):
+        """Muestra el actor asociado a `key`, creándolo solo si aún no está en el visor."""
+        actor = self._actors.get(key)
+        if actor is None:
+            actor = self.plotter_3d.add_mesh(make_mesh(), color=color, show_edges=True)
+            self._actors[key] = actor
+            # Cada actor retiene su malla y sus buffers en la GPU: se quitan del visor los más antiguos
+            while len(self._actors) > self._mesh_cache_size:
+                self.plotter_3d.remove_actor(self._actors.popitem(last=False)[1], render=False)
+        else:
+            self._actors.move_to_end(key)
+            actor.SetVisibility(True)
+
     def display_single_part(self, flute_name, part_name):
         part_info = self.flutes_data.get(flute_name, {}).get(part_name)
         if part_info and part_info.get("solid"):
-            print(f"Mostrando pieza: {flute_name} - {part_name} (Calidad: {self.quality_input.value()})")
-            pv_mesh = cq_to_pyvista(part_info["solid"], self.quality_input.value())
-            self.plotter_3d.add_mesh(pv_mesh, color='tan', show_edges=True)
+            quality = self.quality_input.value()
+            print(f"Mostrando pieza: {flute_name} - {part_name} (Calidad: {quality})")
+            self._show_actor((flute_name, part_name, quality, "single"),
+                             lambda: self._tessellate_part(flute_name, part_name, quality), 'tan')
 
     def display_full_flute(self, flute_name):
         """Ensambla y muestra todas las piezas de una flauta con la lógica de encaje correcta."""
@@ -344,9 +556,11 @@ class FluteBrowserApp(QMainWindow):
             z_pos = z_positions.get(part_name)
 
             if part_info and z_pos is not None:
-                positioned_solid = part_info["solid"].translate((0, 0, z_pos))
-                pv_mesh = cq_to_pyvista(positioned_solid, self.quality_input.value())
-                self.plotter_3d.add_mesh(pv_mesh, color=colors[i % len(colors)], show_edges=True)
+                # Se traslada la malla teselada (en caché) en lugar de re-teselar el sólido trasladado
+                quality = self.quality_input.value()
+                self._show_actor((flute_name, part_name, quality, "full"),
+                                 lambda: self._tessellate_part(flute_name, part_name, quality).translate((0, 0, z_pos), inplace=False),
+                                 colors[i % len(colors)])
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -0,0 +1,50 @@
+import difflib
+
+import pytest
+
+pytest.importorskip("PyQt5")
+pytest.importorskip("pyvistaqt")
+from navegador_flautas import FileCorrector
+
+NAMES = FileCorrector.CORRECT_NAMES
+
+
+def difflib_match(typo):
+    """Comportamiento original: difflib sobre todos los nombres correctos."""
+    matches = difflib.get_close_matches(typo, NAMES, n=1, cutoff=0.8)
+    return matches[0] if matches else None
+
+
+def generated_typos():
+    """Borrados, transposiciones, sustituciones e inserciones de un carácter y truncados."""
+    typos = set()
+    for name in NAMES:
+        stem = name[:-len(".json")]
+        for i in range(len(stem)):
+            typos.add(stem[:i] + stem[i+1:] + ".json")
+            if i + 1 < len(stem): typos.add(stem[:i] + stem[i+1] + stem[i] + stem[i+2:] + ".json")
+            for c in "aeiorstnlhgjxp_":
+                typos.add(stem[:i] + c + stem[i+1:] + ".json")
+                typos.add(stem[:i] + c + stem[i:] + ".json")
+        for k in range(1, len(stem)): typos.add(stem[:k] + ".json")
+    return sorted(typos - set(NAMES))
+
+
+@pytest.mark.parametrize("typo, expected", [
+    ("rihgt_external.json", "right_external.json"),
+    ("headjoint_ext.json", "headjoint_external.json"),
+    ("leot_external.json", "left_external.json"),
+    ("rigot_external.json", "right_external.json"),
+    ("rigth.json", "right.json"),
+    ("headjiont.json", "headjoint.json"),
+    ("foto.json", "foot.json"),
+])
+def test_known_typos(typo, expected):
+    assert FileCorrector(".").find_closest_match(typo) == expected
+
+
+def test_matches_difflib_on_generated_typos():
+    corrector = FileCorrector(".")
+    mismatches = [(t, difflib_match(t), corrector.find_closest_match(t)) for t in generated_typos()
+                  if corrector.find_closest_match(t) != difflib_match(t)]
+    assert mismatches == []
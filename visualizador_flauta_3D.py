@@ -1,15 +1,35 @@
 import sys
 import os
+import io
 import json
+import multiprocessing
+import concurrent.futures
+from collections import OrderedDict
+from functools import lru_cache
+try:
+    import orjson # Opcional: parseo de .json más rápido
+except ImportError:
+    orjson = None
 import numpy as np
 import cadquery as cq
 import pyvista as pv
+from OCP.BRep import BRep_Tool
+from OCP.BRepBuilderAPI import BRepBuilderAPI_MakePolygon, BRepBuilderAPI_MakeFace, BRepBuilderAPI_Transform
+from OCP.BRepMesh import BRepMesh_IncrementalMesh
+from OCP.BRepPrimAPI import BRepPrimAPI_MakeRevol
+from OCP.gp import gp_Pnt, gp_Ax1, gp_Dir, gp_Trsf, gp_Vec
+try:
+    import manifold3d # Opcional: motor booleano sobre mallas
+except ImportError:
+    manifold3d = None
+from OCP.TopAbs import TopAbs_REVERSED
+from OCP.TopLoc import TopLoc_Location
 
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QFileDialog,
                              QMessageBox, QTabWidget, QSpinBox, QFormLayout,
-                             QGroupBox, QDoubleSpinBox) #<-- LÍNEA CORREGIDA
-from PyQt5.QtCore import Qt
+                             QGroupBox, QDoubleSpinBox, QComboBox) #<-- LÍNEA CORREGIDA
+from PyQt5.QtCore import Qt, QTimer, QObject, QThread, pyqtSignal
 from pyvistaqt import QtInteractor
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -17,43 +37,174 @@ import matplotlib.patches as patches
 
 # --- Funciones de Geometría ---
 
-def interpolate_radius(y_pos, profile_points):
-    """Calcula el radio en una posición Y específica."""
-    p1, p2 = None, None
-    for i in range(len(profile_points) - 1):
-        if profile_points[i]['position'] <= y_pos <= profile_points[i+1]['position']:
-            p1, p2 = profile_points[i], profile_points[i+1]; break
-    if not p1: return profile_points[-1]['diameter'] / 2.0
-    y1, r1 = p1['position'], p1['diameter'] / 2.0; y2, r2 = p2['position'], p2['diameter'] / 2.0
-    if abs(y2 - y1) < 1e-9: return r1
-    return r1 + (r2 - r1) * ((y_pos - y1) / (y2 - y1))
-
-def create_cq_solid_from_profile(profile_points):
-    """Crea un sólido de CadQuery a partir de un perfil de revolución."""
-    path_pts = [(p['diameter'] / 2, p['position']) for p in profile_points]
-    if not path_pts: return None
+def _validate_profile(pos, rad):
+    """Comprueba un perfil antes de modelarlo. Devuelve la descripción del problema o None si es válido."""
+    if len(pos) < 2: return "tiene menos de 2 puntos"
+    if not (np.all(np.isfinite(pos)) and np.all(np.isfinite(rad))): return "contiene valores no numéricos"
+    if np.any(np.diff(pos) < 0): return "las posiciones no son crecientes"
+    if np.any(rad < 0): return "hay diámetros negativos"
+    return None
+
+def create_cq_solid_from_profile(positions, radii):
+    """Crea un sólido de CadQuery a partir de un perfil de revolución (arrays de posiciones y radios)."""
+    if len(positions) == 0: return None
     
-    if path_pts[0][0] > 1e-6: path_pts.insert(0, (0, path_pts[0][1]))
-    if path_pts[-1][0] > 1e-6: path_pts.append((0, path_pts[-1][1]))
+    # Cierra el perfil sobre el eje si los extremos no llegan a él
+    if radii[0] > 1e-6: positions, radii = np.r_[positions[0], positions], np.r_[0.0, radii]
+    if radii[-1] > 1e-6: positions, radii = np.r_[positions, positions[-1]], np.r_[radii, 0.0]
     
     try:
-        solid = cq.Workplane("XZ").polyline(path_pts).close().revolve()
-        return solid
+        # Directamente con OCC: polígono en el plano XZ revolucionado alrededor del eje Z
+        poly = BRepBuilderAPI_MakePolygon()
+        for r, z in zip(radii.tolist(), positions.tolist()): poly.Add(gp_Pnt(r, 0, z))
+        poly.Close()
+        face = BRepBuilderAPI_MakeFace(poly.Wire()).Face()
+        revol = BRepPrimAPI_MakeRevol(face, gp_Ax1(gp_Pnt(0, 0, 0), gp_Dir(0, 0, 1)), 2 * np.pi)
+        return cq.Workplane(cq.Solid(revol.Shape()))
     except Exception as e:
         print(f"ERROR en CadQuery al crear sólido: {e}"); return None
 
+@lru_cache(maxsize=64)
+def _cone_template(r_out, r_in, height):
+    """Cono base (sin posicionar) compartido por los agujeros de igual tamaño."""
+    return cq.Solid.makeCone(r_out, r_in, height).wrapped
+
+def _make_cutter(r_out, r_in, height, x_target, z_pos):
+    """Crea el cortador cónico de un agujero ya orientado y posicionado sobre el cuerpo."""
+    template = _cone_template(round(float(r_out), 4), round(float(r_in), 4), round(float(height), 4))
+    # Una sola transformación compuesta: centrar en Z, girar -90° sobre Y y llevar al agujero
+    center, rot, place = gp_Trsf(), gp_Trsf(), gp_Trsf()
+    center.SetTranslation(gp_Vec(0, 0, -height / 2))
+    rot.SetRotation(gp_Ax1(gp_Pnt(0, 0, 0), gp_Dir(0, 1, 0)), -np.pi / 2)
+    place.SetTranslation(gp_Vec(x_target, 0, z_pos))
+    trsf = place.Multiplied(rot).Multiplied(center)
+    # copy=True: cada cortador recibe su propia copia de la plantilla
+    return cq.Workplane(cq.Solid(BRepBuilderAPI_Transform(template, trsf, True).Shape()))
+
+def _triangulate_shape(shape, tolerance):
+    """
+    Recorre directamente la triangulación de OCC de cada cara y devuelve dos
+    arrays (vértices (N,3) y triángulos (M,3)), sin crear un cq.Vector por vértice.
+    """
+    # Mallado de caras en paralelo, con los mismos parámetros que usa el exportador de CadQuery
+    BRepMesh_IncrementalMesh(shape.wrapped, tolerance, True, 0.1, True)
+    vertex_blocks, face_blocks = [], []
+    offset = 0
+    for face in shape.Faces():
+        loc = TopLoc_Location()
+        poly = BRep_Tool.Triangulation_s(face.wrapped, loc)
+        if poly is None: continue
+        n_nodes, n_tris = poly.NbNodes(), poly.NbTriangles()
+        nodes = np.fromiter((c for i in range(1, n_nodes + 1) for c in poly.Node(i).Coord()),
+                            dtype=np.float64, count=3 * n_nodes).reshape(n_nodes, 3)
+        # La ubicación de la cara se aplica de una vez como matriz 3x4
+        trsf = loc.Transformation()
+        m = np.array([[trsf.Value(r, c) for c in range(1, 5)] for r in range(1, 4)])
+        vertex_blocks.append(nodes @ m[:, :3].T + m[:, 3])
+        tris = np.fromiter((c for i in range(1, n_tris + 1) for c in poly.Triangle(i).Get()),
+                           dtype=np.int32, count=3 * n_tris).reshape(n_tris, 3) + (offset - 1)
+        if face.wrapped.Orientation() == TopAbs_REVERSED: tris = tris[:, [0, 2, 1]]
+        face_blocks.append(tris)
+        offset += n_nodes
+    if not face_blocks: return np.empty((0, 3)), np.empty((0, 3), dtype=np.int32)
+    return np.concatenate(vertex_blocks), np.concatenate(face_blocks)
+
 def cq_to_pyvista(cq_solid, quality=100):
     """Convierte un objeto de CadQuery a PyVista para visualización."""
     if cq_solid is None: return pv.PolyData()
     tolerance = 0.5 / quality
     shape = cq_solid.val()
     if not isinstance(shape, cq.Shape): shape = shape.toOCC()
-    vertices_vector, faces = shape.tessellate(tolerance=tolerance)
-    vertices_np = np.array([v.toTuple() for v in vertices_vector])
+    vertices_np, faces = _triangulate_shape(shape, tolerance)
+    # float32: VTK renderiza (y el STL guarda) en precisión simple; el sólido de CadQuery sigue en float64
+    return _faces_to_pyvista(vertices_np.astype(np.float32), faces)
+
+def _faces_to_pyvista(vertices_np, faces):
+    """Arma el PolyData de PyVista a partir de vértices (N,3) y triángulos (M,3)."""
     if len(faces) == 0: return pv.PolyData()
-    faces_pv = np.c_[np.full(len(faces), 3), faces].astype(np.int_)
+    faces_pv = np.empty((len(faces), 4), dtype=np.int32)
+    faces_pv[:, 0] = 3
+    faces_pv[:, 1:] = faces
     return pv.PolyData(vertices_np, faces_pv)
 
+def cq_to_manifold(cq_solid, tolerance):
+    """Tesela un sólido de CadQuery y lo convierte en un Manifold (fusionando los vértices de costura)."""
+    vertices_np, faces = _triangulate_shape(cq_solid.val(), tolerance)
+    mesh = manifold3d.Mesh(vert_properties=vertices_np.astype(np.float32), tri_verts=faces.astype(np.uint32))
+    mesh.merge()
+    return _check_manifold(manifold3d.Manifold(mesh))
+
+def _check_manifold(manifold):
+    """Manifold no lanza excepciones: una malla inválida se convierte en un Manifold vacío con estado de error."""
+    if manifold.status() != manifold3d.Error.NoError:
+        raise RuntimeError(f"Manifold: {manifold.status().name}")
+    return manifold
+
+def _to_brep(cq_obj):
+    buffer = io.BytesIO()
+    cq_obj.val().exportBrep(buffer)
+    return buffer.getvalue()
+
+def _from_brep(brep):
+    return cq.Workplane(cq.Shape.importBrep(io.BytesIO(brep)))
+
+def _run_booleans(external_brep, internal_brep, cutter_breps, use_manifold, tolerance):
+    """
+    Hace las restas booleanas (cuerpo - ánima - agujeros) en un proceso aparte: OCC y
+    Manifold retienen el GIL, así que en un hilo la GUI quedaría congelada igualmente.
+    Las formas viajan en BREP. Devuelve el BREP del sólido final (OCC) o los arrays
+    (vértices, caras) de la malla resultante (Manifold).
+    """
+    try:
+        external_solid, internal_solid = _from_brep(external_brep), _from_brep(internal_brep)
+        cutters = [_from_brep(b) for b in cutter_breps]
+        if use_manifold:
+            # Todo se tesela una vez y se resta en una sola operación sobre mallas
+            parts = [cq_to_manifold(solid, tolerance) for solid in [external_solid, internal_solid, *cutters]]
+            mesh = _check_manifold(manifold3d.Manifold.batch_boolean(parts, manifold3d.OpType.Subtract)).to_mesh()
+            return None, (np.array(mesh.vert_properties[:, :3]), np.array(mesh.tri_verts))
+        result = external_solid.cut(internal_solid)
+        if cutters:
+            # Un único corte con todos los cortadores agrupados en un compuesto
+            result = result.cut(cq.Compound.makeCompound([c.val() for c in cutters]))
+        return _to_brep(result), None
+    except Exception as e:
+        # Las excepciones de OCC no siempre se pueden enviar de vuelta al proceso principal
+        raise RuntimeError(str(e)) from None
+
+class BoolWorker(QObject):
+    """
+    Espera, fuera del hilo de la GUI, a que el proceso de booleanas termine y emite
+    el sólido de CadQuery o la malla de Manifold, según el motor.
+    """
+    finished = pyqtSignal(object, object, str) # cq_solid, pv_mesh, mensaje de error
+
+    def __init__(self, pool, args):
+        super().__init__()
+        self.pool, self.args = pool, args
+        self._cancelled = False
+        self.pool_broken = False
+
+    def cancel(self):
+        """Deja de esperar el resultado (el proceso en sí se termina desde la ventana)."""
+        self._cancelled = True
+
+    def run(self):
+        try:
+            future = self.pool.submit(_run_booleans, *self.args)
+            while not future.done():
+                if self._cancelled: self.finished.emit(None, None, ""); return
+                concurrent.futures.wait([future], timeout=0.1)
+            brep, mesh_arrays = future.result()
+            if brep is not None: self.finished.emit(_from_brep(brep), None, "")
+            else: self.finished.emit(None, _faces_to_pyvista(*mesh_arrays), "")
+        except concurrent.futures.process.BrokenProcessPool:
+            # El proceso murió (p. ej. un fallo nativo de OCC): la ventana creará otro
+            self.pool_broken = True
+            self.finished.emit(None, None, "El proceso de operaciones booleanas terminó inesperadamente.")
+        except Exception as e:
+            self.finished.emit(None, None, str(e))
+
 # --- Clase Principal de la GUI ---
 
 class FluteAssemblerApp(QMainWindow):
@@ -64,6 +215,16 @@ class FluteAssemblerApp(QMainWindow):
 
         self.internal_data, self.external_data = None, None
         self.final_cq_solid = None
+        self.final_mesh = None # Resultado del motor de mallas (sin BRep)
+        self._hole_patches = []
+        self._profile_version = 0
+        self._hole_params, self._hole_params_key = None, None
+        self._json_cache = {} # ruta -> (mtime, datos)
+        # Mallas teseladas por (versión del sólido, calidad); LRU de pocas entradas
+        self._mesh_cache = OrderedDict()
+        self._solid_version = 0
+        self._last_rendered_version = -1
+        self._bool_thread, self._bool_worker, self._bool_pool = None, None, None
         self.default_dir = os.path.abspath('../data_json/Grenser-Montero/')
         
         main_widget = QWidget(); self.setCentralWidget(main_widget)
@@ -85,9 +246,18 @@ class FluteAssemblerApp(QMainWindow):
         self.quality_input = QSpinBox(self)
         self.quality_input.setRange(50, 500); self.quality_input.setValue(300)
         params_layout.addRow("Calidad de Malla:", self.quality_input)
+        self.export_quality_input = QSpinBox(self)
+        self.export_quality_input.setRange(0, 2000); self.export_quality_input.setSingleStep(50)
+        self.export_quality_input.setSpecialValueText("Igual que la vista") # 0: se guarda la malla mostrada
+        self.export_quality_input.setToolTip("Calidad del STL exportado.\nSi supera la calidad de malla, se vuelve a teselar el sólido con OpenCASCADE.")
+        params_layout.addRow("Calidad de Exportación:", self.export_quality_input)
         self.angle_input = QDoubleSpinBox(self)
         self.angle_input.setRange(-20.0, 20.0); self.angle_input.setValue(5.0); self.angle_input.setSuffix(" °")
         params_layout.addRow("Ángulo Conicidad (°):", self.angle_input)
+        self.engine_input = QComboBox(self)
+        self.engine_input.addItems(["OpenCASCADE (BRep)", "Manifold (malla)"])
+        self.engine_input.setEnabled(manifold3d is not None)
+        params_layout.addRow("Motor Booleano:", self.engine_input)
 
         self.assemble_btn = QPushButton("Generar y Ensamblar Pieza")
         
@@ -111,6 +281,12 @@ class FluteAssemblerApp(QMainWindow):
         self.load_external_btn.clicked.connect(lambda: self.load_file('external'))
         self.assemble_btn.clicked.connect(self.assemble_model)
 
+        # Los cambios rápidos de ángulo se agrupan en un solo redibujado de los agujeros
+        self._redraw_timer = QTimer(self)
+        self._redraw_timer.setSingleShot(True); self._redraw_timer.setInterval(80)
+        self._redraw_timer.timeout.connect(self._update_hole_patches)
+        self.angle_input.valueChanged.connect(self._redraw_timer.start)
+
     def load_file(self, file_type):
         title = f"Seleccionar Perfil {'Interno' if file_type == 'internal' else 'Externo'}"
         path, _ = QFileDialog.getOpenFileName(self, title, self.default_dir, "JSON Files (*.json)")
@@ -118,58 +294,116 @@ class FluteAssemblerApp(QMainWindow):
             if file_type == 'internal': self.internal_path = path; self.internal_label.setText(f"Interno: ...{os.path.basename(path)}")
             else: self.external_path = path; self.external_label.setText(f"Externo: ...{os.path.basename(path)}")
 
+    def _load_json(self, path):
+        """Lee un .json, reutilizando el resultado anterior si el archivo no cambió (mismo mtime)."""
+        mtime = os.stat(path).st_mtime
+        cached = self._json_cache.get(path)
+        if cached and cached[0] == mtime: return cached[1]
+        if orjson is not None:
+            with open(path, 'rb') as f: data = orjson.loads(f.read())
+        else:
+            with open(path, 'r') as f: data = json.load(f)
+        self._json_cache[path] = (mtime, data)
+        return data
+
+    def _prepare_profiles(self, internal_data, external_data):
+        """
+        Extrae una vez las posiciones y radios de ambos perfiles como arrays de NumPy.
+        Los datos y arrays solo se guardan si los dos perfiles se leen sin error y son
+        válidos, para no dejar mezclados los de un archivo anterior ni un perfil inválido.
+        Devuelve la descripción del problema o None.
+        """
+        arrays = {}
+        for name, label, data in (('internal', "interno", internal_data), ('external', "externo", external_data)):
+            points = data['measurements']
+            pos = np.fromiter((p['position'] for p in points), dtype=np.float64, count=len(points))
+            rad = np.fromiter((p['diameter'] / 2 for p in points), dtype=np.float64, count=len(points))
+            problem = _validate_profile(pos, rad)
+            if problem: return f"El perfil {label} no es válido: {problem}."
+            arrays[f'{name}_pos'], arrays[f'{name}_rad'] = pos, rad
+        for attr, values in arrays.items(): setattr(self, attr, values)
+        self.internal_data, self.external_data = internal_data, external_data
+        self._profile_version += 1
+        return None
+
+    def _compute_hole_params(self):
+        """
+        Calcula como arrays los parámetros de todos los agujeros. El resultado se
+        reutiliza hasta que cambian los perfiles o el ángulo de conicidad.
+        """
+        key = (self._profile_version, self.angle_input.value())
+        if self._hole_params_key == key: return self._hole_params
+        n_holes = self.internal_data.get("Number of holes", 0)
+        z_pos = np.asarray(self.internal_data.get("Holes position", [])[:n_holes], dtype=np.float64)
+        r_outer_hole = np.asarray(self.internal_data.get("Holes diameter", [])[:n_holes], dtype=np.float64) / 2.0
+        r_ext = np.interp(z_pos, self.external_pos, self.external_rad)
+        r_int = np.interp(z_pos, self.internal_pos, self.internal_rad)
+        wall_thickness = r_ext - r_int
+        # Agujeros degenerados (sin diámetro o sin pared): no se dibujan ni se cortan
+        valid = (r_outer_hole > 0) & (wall_thickness > 0)
+        if not valid.all(): print(f"Aviso: se omiten {np.count_nonzero(~valid)} agujeros degenerados.")
+        z_pos, r_ext, r_int, wall_thickness, r_outer_hole = (a[valid] for a in (z_pos, r_ext, r_int, wall_thickness, r_outer_hole))
+        self._hole_params = {
+            'z_pos': z_pos, 'r_ext': r_ext, 'r_int': r_int, 'wall_thickness': wall_thickness,
+            'r_outer_hole': r_outer_hole,
+            'r_inner_hole': np.maximum(r_outer_hole + wall_thickness * np.tan(np.deg2rad(key[1])), 0.0),
+        }
+        self._hole_params_key = key
+        return self._hole_params
+
     def assemble_model(self):
         if not hasattr(self, 'internal_path') or not self.internal_path or not hasattr(self, 'external_path') or not self.external_path:
             QMessageBox.warning(self, "Archivos Faltantes", "Por favor, carga ambos perfiles."); return
         try:
-            with open(self.internal_path, 'r') as f: self.internal_data = json.load(f)
-            with open(self.external_path, 'r') as f: self.external_data = json.load(f)
+            internal_data = self._load_json(self.internal_path)
+            external_data = self._load_json(self.external_path)
+            problem = None
+            if internal_data is not self.internal_data or external_data is not self.external_data:
+                problem = self._prepare_profiles(internal_data, external_data)
         except Exception as e:
             QMessageBox.critical(self, "Error de Lectura", f"Error: {e}"); return
+        if problem: QMessageBox.critical(self, "Perfil Inválido", problem); return
         
         print("--- Iniciando Proceso con CadQuery ---")
         self.plot_2d(); QApplication.processEvents()
 
-        external_solid = create_cq_solid_from_profile(self.external_data['measurements'])
-        internal_solid = create_cq_solid_from_profile(self.internal_data['measurements'])
+        external_solid = create_cq_solid_from_profile(self.external_pos, self.external_rad)
+        internal_solid = create_cq_solid_from_profile(self.internal_pos, self.internal_rad)
         if not external_solid or not internal_solid: QMessageBox.critical(self, "Error", "Fallo al crear sólidos base."); return
             
         print("Creando cortadores de agujeros...")
-        cutters = []
-        cone_angle_rad = np.deg2rad(self.angle_input.value())
+        hp = self._compute_hole_params()
+        cutter_args = list(zip(hp['r_outer_hole'], hp['r_inner_hole'], hp['wall_thickness'] + 2.0,
+                               (hp['r_ext'] + hp['r_int']) / 2, hp['z_pos']))
 
-        for i in range(self.internal_data.get("Number of holes", 0)):
-            z_pos = self.internal_data["Holes position"][i]
-            d_outer_hole = self.internal_data["Holes diameter"][i]
-            
-            r_body_ext = interpolate_radius(z_pos, self.external_data['measurements'])
-            r_body_int = interpolate_radius(z_pos, self.internal_data['measurements'])
-            wall_thickness = r_body_ext - r_body_int
-            cutter_height = wall_thickness + 2.0
-            
-            r_outer_hole = d_outer_hole / 2.0
-            change_in_radius = wall_thickness * np.tan(cone_angle_rad)
-            r_inner_hole = r_outer_hole + change_in_radius
-            
-            template_solid = cq.Solid.makeCone(r_outer_hole, r_inner_hole, cutter_height)
-            template_wp = cq.Workplane(template_solid).translate((0,0,-cutter_height/2))
-            
-            x_target = (r_body_ext + r_body_int) / 2
-            
-            cutter = (template_wp
-                      .rotate((0,0,0), (0,1,0), -90)
-                      .translate((x_target, 0, z_pos))
-                     )
-            cutters.append(cutter)
+        cutters = [_make_cutter(*a) for a in cutter_args]
             
         print("Realizando operaciones booleanas...")
-        try:
-            result = external_solid.cut(internal_solid)
-            for cutter in cutters:
-                result = result.cut(cutter)
-            self.final_cq_solid = result
-        except Exception as e:
-            QMessageBox.critical(self, "Error de Ensamblaje", f"La operación booleana falló.\nError: {e}"); return
+        self.assemble_btn.setEnabled(False)
+        QApplication.setOverrideCursor(Qt.BusyCursor)
+        if self._bool_pool is None:
+            # Proceso persistente: solo el primer ensamblaje paga el arranque.
+            # 'spawn' evita hacer fork de un proceso con hilos de Qt activos
+            self._bool_pool = concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        args = (_to_brep(external_solid), _to_brep(internal_solid), [_to_brep(c) for c in cutters],
+                self.engine_input.currentIndex() == 1, 0.5 / self.quality_input.value())
+        self._bool_thread = QThread()
+        self._bool_worker = BoolWorker(self._bool_pool, args)
+        self._bool_worker.moveToThread(self._bool_thread)
+        self._bool_thread.started.connect(self._bool_worker.run)
+        self._bool_worker.finished.connect(self._on_boolean_done)
+        self._bool_worker.finished.connect(self._bool_thread.quit)
+        self._bool_thread.start()
+
+    def _on_boolean_done(self, cq_solid, pv_mesh, error):
+        QApplication.restoreOverrideCursor()
+        self.assemble_btn.setEnabled(True)
+        if self._bool_worker.pool_broken: self._shutdown_bool_pool()
+        if error:
+            QMessageBox.critical(self, "Error de Ensamblaje", f"La operación booleana falló.\nError: {error}"); return
+        if cq_solid is None and pv_mesh is None: return # Cancelado
+        self.final_cq_solid, self.final_mesh = cq_solid, pv_mesh
+        self._solid_version += 1
             
         print("Ensamblaje completado. Mostrando resultado...")
         self.plot_3d()
@@ -177,46 +411,103 @@ class FluteAssemblerApp(QMainWindow):
         
         reply = QMessageBox.question(self, 'Guardar Modelo Final', '¡Ensamblaje completado! ¿Deseas guardar el STL?', QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
         if reply == QMessageBox.Yes: self.export_final_stl()
+
+    def closeEvent(self, event):
+        # Cerrar la ventana no debe destruir un QThread que sigue en marcha
+        if self._bool_thread is not None and self._bool_thread.isRunning():
+            self._bool_worker.cancel(); self._bool_thread.quit(); self._bool_thread.wait()
+        if self._bool_pool is not None: self._shutdown_bool_pool()
+        super().closeEvent(event)
+
+    def _shutdown_bool_pool(self):
+        """Cierra el pool de booleanas sin esperar: una operación en curso no debe bloquear la salida."""
+        processes = list((self._bool_pool._processes or {}).values())
+        self._bool_pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes: process.terminate()
+        self._bool_pool = None
             
     def export_final_stl(self):
-        if not self.final_cq_solid: return
+        if self.final_cq_solid is None and self.final_mesh is None: return
         part_name = self.internal_data.get("Part", "flauta_parte")
         default_filename = os.path.join(self.default_dir, f"{part_name}_FINAL.stl")
         path, _ = QFileDialog.getSaveFileName(self, "Guardar Pieza Final", default_filename, "STL (*.stl)")
         if path:
-            cq.exporters.export(self.final_cq_solid, path, tolerance=(0.5 / self.quality_input.value()))
+            # Si se pide más precisión que la de la vista, OCC vuelve a teselar el sólido;
+            # si no, se escribe en STL binario la misma malla de la vista 3D (ya en caché).
+            # El STL binario guarda float32 por formato: la malla float32 no pierde nada más
+            export_quality = self.export_quality_input.value()
+            pv_mesh = None
+            if self.final_cq_solid is None or export_quality <= self.quality_input.value():
+                pv_mesh = self._get_final_mesh()
+            if pv_mesh is not None and pv_mesh.n_cells:
+                pv_mesh.save(path, binary=True)
+            elif self.final_cq_solid is not None:
+                # La desviación angular (0.1 rad en la vista) se afina en la misma proporción
+                scale = self.quality_input.value() / max(export_quality, self.quality_input.value())
+                cq.exporters.export(self.final_cq_solid, path, tolerance=(0.5 / self.quality_input.value()) * scale,
+                                    angularTolerance=0.1 * scale)
+            else:
+                QMessageBox.warning(self, "Exportar STL", "La malla final está vacía: no se guardó ningún archivo."); return
             print(f"Modelo final guardado en {path}")
             
+    def _hole_polygons(self):
+        """Devuelve los vértices de la sección de todos los agujeros: array (n_holes, 4, 2)."""
+        hp = self._compute_hole_params()
+        z_positions, r_ext, r_int = hp['z_pos'], hp['r_ext'], hp['r_int']
+        r_outer_hole, r_inner_hole = hp['r_outer_hole'], hp['r_inner_hole']
+        n_holes = len(z_positions)
+
+        hole_polys = np.empty((n_holes, 4, 2))
+        hole_polys[:, :, 0] = z_positions[:, None] + np.column_stack((-r_outer_hole, r_outer_hole, r_inner_hole, -r_inner_hole))
+        hole_polys[:, :, 1] = np.column_stack((r_ext, r_ext, r_int, r_int))
+        return hole_polys
+
     def plot_2d(self):
+        self._build_profile_lines()
+        self.mpl_canvas.draw()
+
+    def _build_profile_lines(self):
+        """Redibuja la figura completa: perfiles y un parche por agujero."""
         self.mpl_figure.clear(); ax = self.mpl_figure.add_subplot(111)
-        ax.plot([p['position'] for p in self.internal_data['measurements']], [p['diameter']/2 for p in self.internal_data['measurements']], 'r--', label='Interno')
-        ax.plot([p['position'] for p in self.internal_data['measurements']], [-p['diameter']/2 for p in self.internal_data['measurements']], 'r--')
-        ax.plot([p['position'] for p in self.external_data['measurements']], [p['diameter']/2 for p in self.external_data['measurements']], 'b-', label='Externo')
-        ax.plot([p['position'] for p in self.external_data['measurements']], [-p['diameter']/2 for p in self.external_data['measurements']], 'b-')
-        
-        cone_angle_rad = np.deg2rad(self.angle_input.value())
-        for i in range(self.internal_data.get("Number of holes", 0)):
-            z_pos = self.internal_data["Holes position"][i]
-            d_outer_hole = self.internal_data["Holes diameter"][i]
-            
-            r_ext = interpolate_radius(z_pos, self.external_data['measurements'])
-            r_int = interpolate_radius(z_pos, self.internal_data['measurements'])
-            wall_thickness = r_ext - r_int
-            
-            r_outer_hole = d_outer_hole / 2.0
-            r_inner_hole = r_outer_hole + wall_thickness * np.tan(cone_angle_rad)
-            
-            top_points = [[z_pos-r_outer_hole, r_ext], [z_pos+r_outer_hole, r_ext], [z_pos+r_inner_hole, r_int], [z_pos-r_inner_hole, r_int]]
-            ax.add_patch(patches.Polygon(top_points, closed=True, facecolor='gold', alpha=0.6))
-            
-        ax.set_aspect('equal'); ax.set_xlabel("Posición (mm)"); ax.set_ylabel("Radio (mm)"); ax.set_title("Perfiles"); ax.legend(); ax.grid(True); self.mpl_canvas.draw()
+        ax.plot(self.internal_pos, self.internal_rad, 'r--', label='Interno')
+        ax.plot(self.internal_pos, -self.internal_rad, 'r--')
+        ax.plot(self.external_pos, self.external_rad, 'b-', label='Externo')
+        ax.plot(self.external_pos, -self.external_rad, 'b-')
+        self._hole_patches = [ax.add_patch(patches.Polygon(pts, closed=True, facecolor='gold', alpha=0.6))
+                              for pts in self._hole_polygons()]
+        ax.set_aspect('equal'); ax.set_xlabel("Posición (mm)"); ax.set_ylabel("Radio (mm)"); ax.set_title("Perfiles"); ax.legend(); ax.grid(True)
+
+    def _update_hole_patches(self):
+        """Actualiza solo los vértices de los agujeros (p. ej. al cambiar el ángulo), sin rehacer los ejes."""
+        if not self._hole_patches: return
+        for patch, pts in zip(self._hole_patches, self._hole_polygons()):
+            patch.set_xy(pts)
+        self.mpl_canvas.draw_idle()
     
+    def _get_final_mesh(self):
+        """Devuelve la malla del sólido final, teselándola solo si cambió el sólido o la calidad."""
+        if self.final_cq_solid is None: return self.final_mesh
+        key = (self._solid_version, self.quality_input.value())
+        mesh = self._mesh_cache.get(key)
+        if mesh is None:
+            mesh = cq_to_pyvista(self.final_cq_solid, key[1])
+            self._mesh_cache[key] = mesh
+            if len(self._mesh_cache) > 3: self._mesh_cache.popitem(last=False)
+        else:
+            self._mesh_cache.move_to_end(key)
+        return mesh
+
     def plot_3d(self):
         self.plotter_3d_final.clear()
-        if self.final_cq_solid:
-            pv_mesh = cq_to_pyvista(self.final_cq_solid, self.quality_input.value())
+        pv_mesh = self._get_final_mesh()
+        if pv_mesh is not None:
             self.plotter_3d_final.add_mesh(pv_mesh, color='tan', show_edges=True)
-        self.plotter_3d_final.reset_camera()
+        # La cámara solo se reencuadra cuando hay un sólido nuevo
+        if self._last_rendered_version != self._solid_version:
+            self.plotter_3d_final.reset_camera()
+            self._last_rendered_version = self._solid_version
+        else:
+            self.plotter_3d_final.render()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)